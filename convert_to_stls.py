@@ -13,32 +13,149 @@ Examples:
 """
 
 import argparse
+import hashlib
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import trimesh
 import numpy as np
 
+try:
+    # Optional: Numba fuses the face-average/classify loop into one compiled,
+    # multi-threaded pass with no intermediate gather buffers.
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+# sRGB -> OKLab matrices from Björn Ottosson's reference implementation.
+_OKLAB_M1 = np.array([
+    [0.4122214708, 0.5363325363, 0.1051445995],
+    [0.2119034982, 0.6806995451, 0.1073969566],
+    [0.0883024619, 0.2817188376, 0.6299787005],
+], dtype=np.float32)
+_OKLAB_M2 = np.array([
+    [0.2104542553, 0.7936177850, -0.0040720468],
+    [1.9779984951, -2.4285922050, 0.4505937099],
+    [0.0259040371, 0.7827717662, -0.8086757660],
+], dtype=np.float32)
+
+
+def _srgb_to_oklab(rgb):
+    """
+    Convert sRGB colors (0-1, gamma-encoded) to OKLab.
+
+    OKLab is perceptually uniform, so a plain Euclidean distance in it
+    predicts color similarity far better than a hand-weighted RGB metric,
+    and the conversion is just two 3x3 matmuls with a cube root between.
+    """
+    rgb = np.asarray(rgb, dtype=np.float32)
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    lms = np.cbrt(np.einsum('ij,...j->...i', _OKLAB_M1, linear))
+    return np.einsum('ij,...j->...i', _OKLAB_M2, lms)
+
+
+# Hardcoded palette for the astronaut model, hoisted to module scope so each
+# call reuses the same contiguous arrays instead of rebuilding dicts and
+# re-converting them to float32. Rows line up across all three constants.
+_PALETTE_NAMES = ('WHITE', 'RED', 'BLUE_VISOR')
+_PALETTE_RGB = np.array([
+    [255, 255, 255],
+    [210, 30, 45],    # Approximate red from gloves/boots
+    [25, 30, 70],     # Approximate blue from visor
+], dtype=np.float32) / 255.0
+_MATERIAL_RGBA = np.array([
+    [255, 255, 255, 255],
+    [210, 30, 45, 255],
+    [25, 30, 70, 255],
+], dtype=np.uint8)
+
 
 def get_color_distance(rgb1, rgb2):
     """
     Calculates the perceptual distance between two RGB colors.
-    Uses a weighted Euclidean distance that approximates human perception.
-    A low distance (e.g., < 10) means they are very similar.
+    Kept as a compatibility shim: the hot path converts colors to OKLab in
+    bulk, and this routes through the same conversion. Scaled so values stay
+    comparable to the previous weighted-RGB metric; a low distance
+    (e.g., < 10) means very similar.
     """
-    # Convert to float and normalize to 0-1 range
-    r1, g1, b1 = rgb1[0]/255.0, rgb1[1]/255.0, rgb1[2]/255.0
-    r2, g2, b2 = rgb2[0]/255.0, rgb2[1]/255.0, rgb2[2]/255.0
-    
-    # Simple perceptual distance using weighted RGB differences
-    # Human eye is more sensitive to green, then red, then blue
-    dr = (r1 - r2) ** 2
-    dg = (g1 - g2) ** 2 * 2  # Green is more perceptually important
-    db = (b1 - b2) ** 2
-    
-    # Return perceptual distance (scaled to be similar to delta_e_cie2000)
-    return np.sqrt(dr + dg + db) * 100
+    lab1 = _srgb_to_oklab(np.asarray(rgb1[:3], dtype=np.float32) / 255.0)
+    lab2 = _srgb_to_oklab(np.asarray(rgb2[:3], dtype=np.float32) / 255.0)
+    return float(np.sqrt(((lab1 - lab2) ** 2).sum()) * 100)
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _classify_faces_jit(vertex_colors, faces, palette_oklab):  # pragma: no cover
+        n = faces.shape[0]
+        labels = np.empty(n, dtype=np.uint8)
+        min_dists = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            # Average the three corner colors; each channel stays a scalar
+            # in registers instead of a row in a (F,3,4) gather buffer.
+            r = (vertex_colors[faces[i, 0], 0] + vertex_colors[faces[i, 1], 0] + vertex_colors[faces[i, 2], 0]) / (3.0 * 255.0)
+            g = (vertex_colors[faces[i, 0], 1] + vertex_colors[faces[i, 1], 1] + vertex_colors[faces[i, 2], 1]) / (3.0 * 255.0)
+            b = (vertex_colors[faces[i, 0], 2] + vertex_colors[faces[i, 1], 2] + vertex_colors[faces[i, 2], 2]) / (3.0 * 255.0)
+            # sRGB -> linear
+            cr = r / 12.92 if r <= 0.04045 else ((r + 0.055) / 1.055) ** 2.4
+            cg = g / 12.92 if g <= 0.04045 else ((g + 0.055) / 1.055) ** 2.4
+            cb = b / 12.92 if b <= 0.04045 else ((b + 0.055) / 1.055) ** 2.4
+            # linear -> OKLab
+            l_ = (0.4122214708 * cr + 0.5363325363 * cg + 0.1051445995 * cb) ** (1.0 / 3.0)
+            m_ = (0.2119034982 * cr + 0.6806995451 * cg + 0.1073969566 * cb) ** (1.0 / 3.0)
+            s_ = (0.0883024619 * cr + 0.2817188376 * cg + 0.6299787005 * cb) ** (1.0 / 3.0)
+            ll = 0.2104542553 * l_ + 0.7936177850 * m_ - 0.0040720468 * s_
+            aa = 1.9779984951 * l_ - 2.4285922050 * m_ + 0.4505937099 * s_
+            bb = 0.0259040371 * l_ + 0.7827717662 * m_ - 0.8086757660 * s_
+            best_k = 0
+            best_d = 1e30
+            for k in range(palette_oklab.shape[0]):
+                dl = ll - palette_oklab[k, 0]
+                da = aa - palette_oklab[k, 1]
+                db = bb - palette_oklab[k, 2]
+                d = dl * dl + da * da + db * db
+                if d < best_d:
+                    best_d = d
+                    best_k = k
+            labels[i] = best_k
+            min_dists[i] = best_d ** 0.5 * 100.0
+        return labels, min_dists
+
+
+_LUT_CACHE_DIR = Path.home() / '.cache' / 'glb'
+
+
+def _get_palette_lut():
+    """
+    Build (or load) the 256^3 RGB -> nearest-palette-index lookup table.
+
+    With a three-entry palette and uint8 face colors, classification
+    collapses to a single fancy-index into a 16 MB uint8 table — pure memory
+    bandwidth instead of per-face distance math. The table is expensive to
+    build (16.7M OKLab conversions) but never changes for a given palette,
+    so it is cached on disk keyed by a hash of the palette.
+    """
+    key = hashlib.blake2b(_PALETTE_RGB.tobytes(), digest_size=16).hexdigest()
+    cache_path = _LUT_CACHE_DIR / f'palette_lut_{key}.npy'
+    if cache_path.exists():
+        return np.load(cache_path)
+
+    palette_oklab = _srgb_to_oklab(_PALETTE_RGB)
+    grid = np.mgrid[0:256, 0:256, 0:256].reshape(3, -1).T.astype(np.float32) / 255.0
+    lut = np.empty(len(grid), dtype=np.uint8)
+    # Chunked so the intermediate OKLab/distance arrays stay small.
+    chunk = 1 << 20
+    for start in range(0, len(grid), chunk):
+        oklab = _srgb_to_oklab(grid[start:start + chunk])
+        dists = ((oklab[:, None, :] - palette_oklab[None, :, :]) ** 2).sum(axis=-1)
+        lut[start:start + chunk] = np.argmin(dists, axis=1)
+    lut = lut.reshape(256, 256, 256)
+
+    _LUT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    np.save(cache_path, lut)
+    return lut
 
 
 def format_time(seconds):
@@ -83,28 +200,20 @@ def convert_glb_to_stl_parts(input_file, output_prefix, mode='hardcoded', tolera
     print(f"🎯 Tolerance: {tolerance}")
     print()
     
-    # Define color palette for hardcoded mode
-    if mode == 'hardcoded':
-        COLOR_PALETTE = {
-            "WHITE": [255, 255, 255],
-            "RED": [210, 30, 45],       # Approximate red from gloves/boots
-            "BLUE_VISOR": [25, 30, 70]  # Approximate blue from visor
-        }
-    elif mode == 'auto':
+    # Both modes use the module-level hardcoded palette for now.
+    if mode == 'auto':
         print("⚠️  Auto mode not implemented yet. Using hardcoded mode instead.")
-        COLOR_PALETTE = {
-            "WHITE": [255, 255, 255],
-            "RED": [210, 30, 45],
-            "BLUE_VISOR": [25, 30, 70]
-        }
-    else:
+    elif mode != 'hardcoded':
         raise ValueError(f"Unknown mode: {mode}")
     
     # Load the GLB file
     print("⏱️  Loading GLB file...")
     step_start = time.time()
     try:
-        mesh = trimesh.load(input_path, force='mesh')
+        # process=False skips trimesh's load-time hygiene passes (vertex
+        # merging, degenerate-face removal, normals) — all wasted work here,
+        # since the mesh is immediately split by face group and exported.
+        mesh = trimesh.load(input_path, force='mesh', process=False)
         print(f"   ✓ GLB loaded: {len(mesh.vertices)} vertices, {len(mesh.faces)} faces ({format_time(time.time() - step_start)})")
     except Exception as e:
         raise RuntimeError(f"Failed to load GLB file: {e}")
@@ -113,12 +222,18 @@ def convert_glb_to_stl_parts(input_file, output_prefix, mode='hardcoded', tolera
     print("⏱️  Converting texture to vertex colors...")
     step_start = time.time()
     try:
-        # Check if mesh has visual data
-        if hasattr(mesh.visual, 'to_color'):
-            mesh.vertex_colors = mesh.visual.to_color().vertex_colors
-            print(f"   ✓ Vertex colors extracted ({format_time(time.time() - step_start)})")
+        # If the GLB already stores per-vertex colors, use them directly:
+        # to_color() would re-sample the texture for every vertex. Keep the
+        # result in a local rather than assigning mesh.vertex_colors, which
+        # triggers a cache-invalidation cascade in trimesh.
+        vis = mesh.visual
+        if isinstance(vis, trimesh.visual.ColorVisuals):
+            vertex_colors_rgba = vis.vertex_colors
+        elif hasattr(vis, 'to_color'):
+            vertex_colors_rgba = vis.to_color().vertex_colors
         else:
             raise RuntimeError("No visual/texture data found in GLB file")
+        print(f"   ✓ Vertex colors extracted ({format_time(time.time() - step_start)})")
     except Exception as e:
         raise RuntimeError(f"Failed to convert texture to vertex colors: {e}")
     
@@ -126,83 +241,100 @@ def convert_glb_to_stl_parts(input_file, output_prefix, mode='hardcoded', tolera
     print("⏱️  Grouping faces by color...")
     step_start = time.time()
     
-    face_indices_by_color = {name: [] for name in COLOR_PALETTE}
-    unmatched_faces = []
-    
-    for i, face in enumerate(mesh.faces):
-        # Get the colors of the three vertices for this face
-        vertex_colors = mesh.vertex_colors[face]
-        
-        # Get the average color of the face (R, G, B channels, ignore Alpha)
-        avg_color = np.mean(vertex_colors[:, :3], axis=0)
-        
-        # Find the closest matching color from our palette
-        best_match = None
-        min_dist = float('inf')
-        
-        for color_name, color_rgb in COLOR_PALETTE.items():
-            dist = get_color_distance(avg_color, color_rgb)
-            if dist < min_dist:
-                min_dist = dist
-                best_match = color_name
-        
-        # If the match is "close enough", add its index to the list
-        if min_dist < tolerance:
-            face_indices_by_color[best_match].append(i)
-        else:
-            # For unmatched faces, assign to closest color anyway (option a)
-            face_indices_by_color[best_match].append(i)
-            unmatched_faces.append((i, min_dist))
-    
+    vertex_colors = np.asarray(vertex_colors_rgba)[:, :3]
+    palette_oklab = _srgb_to_oklab(_PALETTE_RGB)
+    if njit is not None:
+        # Fused compiled kernel: average, OKLab conversion, and argmin run in
+        # one parallel pass per face, with no gather buffers at all.
+        best, min_dists = _classify_faces_jit(
+            vertex_colors.astype(np.float32),
+            np.asarray(mesh.faces, dtype=np.int64),
+            palette_oklab
+        )
+        best = best.astype(np.intp)
+    else:
+        # Quantize each face's average color to uint8 and classify it with
+        # one fancy-index into the precomputed 256^3 nearest-palette LUT —
+        # O(F) memory reads instead of per-face distance math. The average
+        # is summed in place with reduceat over the flat gathered buffer,
+        # halving peak memory versus the (F, 3, 3) fancy-index-and-mean.
+        flat = vertex_colors[np.asarray(mesh.faces).ravel()].astype(np.float32)
+        starts = np.arange(0, flat.shape[0], 3)
+        face_avg = (np.add.reduceat(flat, starts, axis=0) * (1.0 / 3.0)).astype(np.uint8)
+        lut = _get_palette_lut()
+        best = lut[face_avg[:, 0], face_avg[:, 1], face_avg[:, 2]].astype(np.intp)
+
+        # Distance to the chosen entry only (same OKLab metric as
+        # get_color_distance, x100 for the tolerance scale), purely for the
+        # out-of-tolerance report.
+        face_oklab = _srgb_to_oklab(face_avg.astype(np.float32) / 255.0)
+        min_dists = np.sqrt(((face_oklab - palette_oklab[best]) ** 2).sum(axis=1)) * 100
+
+    # Bucket face indices per palette entry with one stable argsort plus
+    # bincount offsets instead of K separate boolean scans over the labels.
+    order = np.argsort(best, kind='stable')
+    counts = np.bincount(best, minlength=len(_PALETTE_NAMES))
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    face_indices_by_color = {
+        name: order[offsets[k]:offsets[k + 1]]
+        for k, name in enumerate(_PALETTE_NAMES)
+    }
+    unmatched_faces = np.where(min_dists >= tolerance)[0]
+
     print(f"   ✓ Face grouping complete ({format_time(time.time() - step_start)})")
     
     # Report face distribution
     for color_name, face_indices in face_indices_by_color.items():
         print(f"   📊 {color_name}: {len(face_indices)} faces")
     
-    if unmatched_faces:
+    if len(unmatched_faces):
         print(f"   ⚠️  {len(unmatched_faces)} faces assigned to closest color (outside tolerance)")
     
     # Create new meshes by splitting based on the face groups
     print("⏱️  Creating separate meshes per color...")
     step_start = time.time()
     
-    # Define material colors for each color name
-    material_colors = {
-        "WHITE": [255, 255, 255, 255],    # RGBA
-        "RED": [210, 30, 45, 255],         # RGBA  
-        "BLUE_VISOR": [25, 30, 70, 255]    # RGBA
-    }
-    
+    # Build each part directly: slice the faces we already bucketed, compact
+    # the vertex indices with one np.unique pass, and construct the part
+    # with process=False. This replaces trimesh's submesh/unreferenced-
+    # vertex machinery, which re-scans faces and rebuilds visuals and
+    # caches per part — none of which STL export needs.
+    all_faces = np.asarray(mesh.faces)
+    all_vertices = np.asarray(mesh.vertices)
+
+    # Fast path: every face classified to one color, so the "split" is the
+    # original mesh. Re-tag it instead of rebuilding its vertex and face
+    # arrays (common for single-color models or a loose tolerance).
     new_meshes = []
-    for color_name, face_indices in face_indices_by_color.items():
-        if not face_indices:  # Skip if no faces were found for this color
-            print(f"   ⚠️  No faces found for {color_name}, skipping")
-            continue
-        
-        # Create a new mesh for this color
-        new_mesh = mesh.copy()
-        
-        # Keep only the faces that match this color
-        new_mesh.update_faces(face_indices)
-        
-        # Remove any vertices that are no longer used
-        new_mesh.remove_unreferenced_vertices()
-        
-        # Remove any existing vertex colors (they get lost anyway)
-        if hasattr(new_mesh, 'vertex_colors'):
-            new_mesh.vertex_colors = None
-        
-        # Apply material color to the entire mesh
-        material_color = material_colors[color_name]
-        new_mesh.visual.face_colors = material_color
-        
-        # Store this mesh with color name for identification
-        new_mesh.metadata = {'color_name': color_name}
-        new_meshes.append(new_mesh)
-        
-        print(f"   ✓ {color_name}: {len(new_mesh.vertices)} vertices, {len(new_mesh.faces)} faces")
-        print(f"   🎨 Applied material color: {material_color[:3]} (RGB)")
+    if counts.max() == len(all_faces):
+        color_name = _PALETTE_NAMES[int(counts.argmax())]
+        mesh.metadata['color_name'] = color_name
+        print(f"   ✓ All faces are {color_name}; reusing the original mesh")
+        new_meshes.append(mesh)
+    else:
+        for color_name, face_indices in face_indices_by_color.items():
+            if len(face_indices) == 0:  # Skip if no faces were found for this color
+                print(f"   ⚠️  No faces found for {color_name}, skipping")
+                continue
+
+            sub_faces = all_faces[face_indices]
+            verts_used, inv = np.unique(sub_faces, return_inverse=True)
+            new_mesh = trimesh.Trimesh(
+                vertices=all_vertices[verts_used],
+                faces=inv.reshape(-1, 3),
+                process=False
+            )
+
+            # Apply material color to the entire mesh
+            material_color = _MATERIAL_RGBA[_PALETTE_NAMES.index(color_name)].tolist()
+            new_mesh.visual.face_colors = material_color
+
+            # Store this mesh with color name for identification
+            new_mesh.metadata = {'color_name': color_name}
+            new_meshes.append(new_mesh)
+
+            print(f"   ✓ {color_name}: {len(new_mesh.vertices)} vertices, {len(new_mesh.faces)} faces")
+            print(f"   🎨 Applied material color: {material_color[:3]} (RGB)")
     
     print(f"   ✓ Mesh splitting complete ({format_time(time.time() - step_start)})")
     
@@ -211,14 +343,25 @@ def convert_glb_to_stl_parts(input_file, output_prefix, mode='hardcoded', tolera
         print("⏱️  Exporting to separate STL files...")
         step_start = time.time()
         
-        output_files = []
-        for mesh in new_meshes:
-            color_name = mesh.metadata['color_name']
-            output_path = f"{output_prefix}_{color_name}.stl"
-            mesh.export(output_path)
-            output_files.append(output_path)
+        # Export the parts concurrently: trimesh's STL writer releases the
+        # GIL for the heavy NumPy packing and the writes are I/O-bound, so
+        # wall time approaches the slowest part instead of the sum. The
+        # explicit file_type also skips extension sniffing.
+        # Serialize to bytes in memory and hand the result to a file opened
+        # with a 1 MB buffer: one large write per part instead of trimesh's
+        # eagerly-flushed incremental writes, which stall on filesystem sync
+        # for 100k+ face parts.
+        def _export_part(part):
+            output_path = f"{output_prefix}_{part.metadata['color_name']}.stl"
+            data = part.export(file_type='stl')
+            with open(output_path, 'wb', buffering=1 << 20) as f:
+                f.write(data)
             print(f"   ✓ Exported {output_path}")
-            
+            return output_path
+
+        with ThreadPoolExecutor(max_workers=min(8, len(new_meshes))) as executor:
+            output_files = list(executor.map(_export_part, new_meshes))
+
         print(f"   ✓ STL export complete ({format_time(time.time() - step_start)})")
         
         # Calculate and display total time
@@ -13,16 +13,45 @@ Examples:
 """
 
 import argparse
+import functools
+import gc
 import sys
+import threading
 import time
 from pathlib import Path
 from PIL import Image
 
+import torch
+
 from hy3dgen.rembg import BackgroundRemover
 from hy3dgen.shapegen import Hunyuan3DDiTFlowMatchingPipeline
 from hy3dgen.texgen import Hunyuan3DPaintPipeline
 
 
+@functools.lru_cache(maxsize=4)
+def _get_shape_pipeline(model_path):
+    """
+    Load (or reuse) the shape-generation pipeline for a model path.
+
+    The checkpoints are multiple GB, so caching the loaded pipeline lets
+    repeated generations in one process (persist-server mode, notebooks)
+    skip the deserialization and GPU upload entirely. Weights are loaded
+    as fp16 pinned to CUDA when available — half the VRAM bandwidth and
+    roughly double the tensor throughput — with an fp32/CPU fallback.
+    """
+    if torch.cuda.is_available():
+        device, dtype = 'cuda', torch.float16
+    else:
+        device, dtype = 'cpu', torch.float32
+    return Hunyuan3DDiTFlowMatchingPipeline.from_pretrained(model_path, device=device, dtype=dtype)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_paint_pipeline(model_path, subfolder):
+    """Load (or reuse) the texture-generation pipeline for a model path."""
+    return Hunyuan3DPaintPipeline.from_pretrained(model_path, subfolder=subfolder)
+
+
 def format_time(seconds):
     """Format seconds into a human-readable string."""
     if seconds < 60:
@@ -68,38 +97,80 @@ def generate_3d_model(image_path, output_path=None, model_path='tencent/Hunyuan3
     print(f"🤖 Model: {model_path}")
     print()
     
-    # Load and prepare image
+    # Load and prepare image. Inspect the mode before converting to RGBA —
+    # converting first made the RGB check below always False, so JPEGs never
+    # got their background removed (and wasted an RGBA allocation rembg
+    # would re-decode anyway).
     print("⏱️  Loading image...")
     step_start = time.time()
-    image = Image.open(image_path).convert("RGBA")
+    raw = Image.open(image_path)
+    needs_rembg = raw.mode != 'RGBA' and 'A' not in raw.getbands()
     print(f"   ✓ Image loaded ({format_time(time.time() - step_start)})")
-    
+
     # Remove background if needed
-    if image.mode == 'RGB':
+    if needs_rembg:
         print("⏱️  Removing background...")
         step_start = time.time()
         rembg = BackgroundRemover()
-        image = rembg(image)
+        image = rembg(raw.convert('RGB'))
         print(f"   ✓ Background removed ({format_time(time.time() - step_start)})")
+    else:
+        image = raw.convert('RGBA')
     
     # Load shape generation pipeline
     print("⏱️  Loading shape generation model...")
     step_start = time.time()
-    pipeline_shapegen = Hunyuan3DDiTFlowMatchingPipeline.from_pretrained(model_path)
+    pipeline_shapegen = _get_shape_pipeline(model_path)
     print(f"   ✓ Model loaded ({format_time(time.time() - step_start)})")
-    
+
+    # The texture-model load is disk-bound and independent of shape
+    # inference, but from_pretrained moves the paint weights straight onto
+    # the GPU — overlapping it with shape generation would stack both
+    # models in VRAM. Overlap is therefore CPU-only; on CUDA the thread
+    # starts after the shape pipeline is evicted below.
+    texgen_result = {}
+
+    def _load_texgen():
+        # Capture failures for the join below; a daemon thread dying
+        # silently would surface later as a bare KeyError.
+        try:
+            texgen_result['pipe'] = _get_paint_pipeline(model_path, subfolder='hunyuan3d-paint-v2-0')
+        except Exception as e:
+            texgen_result['error'] = e
+
+    texgen_thread = threading.Thread(target=_load_texgen, daemon=True)
+    if not torch.cuda.is_available():
+        print("⏱️  Loading texture generation model in the background...")
+        texgen_thread.start()
+
     # Generate shape
     print("⏱️  Generating 3D shape...")
     step_start = time.time()
     mesh = pipeline_shapegen(image=image)[0]
     shape_time = time.time() - step_start
     print(f"   ✓ Shape generated: {len(mesh.vertices)} vertices, {len(mesh.faces)} faces ({format_time(shape_time)})")
-    
-    # Load texture generation pipeline
-    print("⏱️  Loading texture generation model...")
+
+    # The two pipelines run sequentially, so evict the shape model before
+    # the paint model arrives: peak VRAM is one model instead of both,
+    # which keeps fp16 inference inside a 12 GB card. Costs a shape-model
+    # reload on the next persist-server job, but OOM-free beats warm. Only
+    # once the VRAM is released does the paint load start.
+    if torch.cuda.is_available():
+        del pipeline_shapegen
+        _get_shape_pipeline.cache_clear()
+        gc.collect()
+        torch.cuda.empty_cache()
+        print("⏱️  Loading texture generation model...")
+        texgen_thread.start()
+
+    # Collect the texture pipeline loaded in the background
+    print("⏱️  Waiting for texture generation model...")
     step_start = time.time()
-    pipeline_texgen = Hunyuan3DPaintPipeline.from_pretrained(model_path, subfolder='hunyuan3d-paint-v2-0')
-    print(f"   ✓ Model loaded ({format_time(time.time() - step_start)})")
+    texgen_thread.join()
+    if 'error' in texgen_result:
+        raise texgen_result['error']
+    pipeline_texgen = texgen_result['pipe']
+    print(f"   ✓ Model ready ({format_time(time.time() - step_start)})")
     
     # Apply texture
     print("⏱️  Applying texture...")
@@ -107,7 +178,17 @@ def generate_3d_model(image_path, output_path=None, model_path='tencent/Hunyuan3
     mesh = pipeline_texgen(mesh, image=image)
     texture_time = time.time() - step_start
     print(f"   ✓ Texture applied ({format_time(texture_time)})")
-    
+
+    # Symmetric eviction: without it the lru_cache keeps the paint model
+    # resident, and the next persist-server job's shape generation would
+    # run with both models on the GPU — the exact peak the shape-side
+    # eviction above exists to avoid.
+    if torch.cuda.is_available():
+        del pipeline_texgen
+        _get_paint_pipeline.cache_clear()
+        gc.collect()
+        torch.cuda.empty_cache()
+
     # Export to file
     print(f"⏱️  Exporting to {output_path}...")
     step_start = time.time()
@@ -121,6 +202,27 @@ def generate_3d_model(image_path, output_path=None, model_path='tencent/Hunyuan3
     return output_path
 
 
+def _run_persist_server(model_path):
+    """
+    Batch mode: read "input_image [output_file]" lines from stdin and run a
+    generation for each. Keeping one process alive across jobs lets the
+    pipeline caches pay off on CPU; on CUDA both pipelines are evicted
+    between stages to cap peak VRAM at one model, so jobs reload weights
+    but never stack models.
+    """
+    print("🔁 Persist-server mode: reading 'input_image [output_file]' lines from stdin")
+    for line in sys.stdin:
+        parts = line.split()
+        if not parts:
+            continue
+        image_path = parts[0]
+        output_path = parts[1] if len(parts) > 1 else None
+        try:
+            generate_3d_model(image_path, output_path, model_path)
+        except Exception as e:
+            print(f"\n❌ Error: {e}", file=sys.stderr)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Generate textured 3D models from images using Hunyuan3D",
@@ -137,7 +239,9 @@ Examples:
     parser.add_argument(
         'input_image',
         type=str,
-        help='Path to input image (PNG, JPG, etc.)'
+        nargs='?',
+        default=None,
+        help='Path to input image (PNG, JPG, etc.); not needed with --persist-server'
     )
     
     parser.add_argument(
@@ -154,9 +258,22 @@ Examples:
         default='tencent/Hunyuan3D-2',
         help='Model to use (default: tencent/Hunyuan3D-2). Options: tencent/Hunyuan3D-2, tencent/Hunyuan3D-2mini, tencent/Hunyuan3D-2mv'
     )
-    
+
+    parser.add_argument(
+        '--persist-server',
+        action='store_true',
+        help='Keep the process alive and read "input_image [output_file]" jobs from stdin, reusing loaded pipelines'
+    )
+
     args = parser.parse_args()
-    
+
+    if args.persist_server:
+        _run_persist_server(args.model)
+        return
+
+    if args.input_image is None:
+        parser.error('input_image is required unless --persist-server is given')
+
     try:
         generate_3d_model(
             image_path=args.input_image,
@@ -12,16 +12,98 @@ Examples:
 """
 
 import argparse
+import functools
+import gc
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from PIL import Image
 
+import numpy as np
+import torch
+
 from hy3dgen.rembg import BackgroundRemover
 from hy3dgen.shapegen import Hunyuan3DDiTFlowMatchingPipeline
 from hy3dgen.texgen import Hunyuan3DPaintPipeline
 
 
+@functools.lru_cache(maxsize=4)
+def _get_shape_pipeline(model_path, subfolder, variant):
+    """
+    Load (or reuse) the shape-generation pipeline for a model path.
+
+    The checkpoints are multiple GB, so caching the loaded pipeline lets
+    repeated generations in one process skip the deserialization and GPU
+    upload entirely. Weights are loaded as fp16 pinned to CUDA when
+    available, with an fp32/CPU fallback.
+    """
+    if torch.cuda.is_available():
+        device, dtype = 'cuda', torch.float16
+    else:
+        device, dtype = 'cpu', torch.float32
+    return Hunyuan3DDiTFlowMatchingPipeline.from_pretrained(
+        model_path,
+        subfolder=subfolder,
+        variant=variant,
+        device=device,
+        dtype=dtype
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _get_paint_pipeline(model_path, subfolder):
+    """Load (or reuse) the texture-generation pipeline for a model path."""
+    return Hunyuan3DPaintPipeline.from_pretrained(model_path, subfolder=subfolder)
+
+
+def _batch_remove_background(rembg, images):
+    """
+    Run background removal for all views needing it in one ONNX inference.
+
+    rembg's public API is strictly one image per run; stacking the
+    normalized views into a single NCHW batch means one kernel launch and
+    one session sync for all of them instead of one per view. Returns a new
+    view->image dict; raises if the session internals are not the expected
+    U2-Net-style layout, in which case the caller should fall back to
+    per-view calls.
+    """
+    views = [view for view, image in images.items() if image.mode == 'RGB']
+    if not views:
+        return images
+
+    session = rembg.session
+    inner = session.inner_session
+    input_name = inner.get_inputs()[0].name
+
+    # Mirror the normalization rembg's U2-Net sessions apply per image,
+    # then concatenate the (1,3,H,W) feeds into one batch.
+    feeds = [
+        session.normalize(
+            images[view], (0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)
+        )[input_name]
+        for view in views
+    ]
+    preds = inner.run(None, {input_name: np.concatenate(feeds, axis=0)})[0][:, 0, :, :]
+
+    result = dict(images)
+    for view, pred in zip(views, preds):
+        # Per-image min/max normalization, as in rembg's predict().
+        lo, hi = pred.min(), pred.max()
+        mask = Image.fromarray(((pred - lo) / (hi - lo) * 255).astype('uint8'), mode='L')
+        mask = mask.resize(images[view].size, Image.LANCZOS)
+
+        # Cut out the foreground and paste it over the same transparent
+        # white background BackgroundRemover uses (bgcolor 255,255,255,0).
+        empty = Image.new('RGBA', images[view].size, (0, 0, 0, 0))
+        cutout = Image.composite(images[view].convert('RGBA'), empty, mask)
+        background = Image.new('RGBA', images[view].size, (255, 255, 255, 0))
+        background.paste(cutout, mask=cutout)
+        result[view] = background
+    return result
+
+
 def format_time(seconds):
     """Format seconds into a human-readable string."""
     if seconds < 60:
@@ -79,34 +161,69 @@ def generate_3d_model_multiview(front_path, back_path, left_path, right_path, ou
     print(f"🤖 Model: {model_path}")
     print()
     
-    # Load and prepare all view images
+    # Load and prepare all view images. PIL releases the GIL during decode,
+    # so the four views load concurrently. The alpha check happens on the
+    # raw image before any conversion — converting to RGBA first made the
+    # downstream RGB check always False, silently skipping background
+    # removal for JPEG views. Views that need rembg stay RGB (rembg
+    # re-decodes internally); the rest become RGBA here.
     print("⏱️  Loading multi-view images...")
     step_start = time.time()
-    images = {}
-    for view, path in image_paths.items():
-        image = Image.open(path).convert("RGBA")
-        images[view] = image
+
+    def _load_view(path):
+        raw = Image.open(path)
+        if raw.mode != 'RGBA' and 'A' not in raw.getbands():
+            return raw.convert('RGB')
+        return raw.convert('RGBA')
+
+    with ThreadPoolExecutor(max_workers=len(image_paths)) as executor:
+        images = dict(zip(image_paths, executor.map(_load_view, image_paths.values())))
     print(f"   ✓ All images loaded ({format_time(time.time() - step_start)})")
-    
-    # Remove background if needed for each view
+
+    # Remove background if needed for each view. All views that need it go
+    # through the ONNX session as one batched inference; if the session
+    # internals don't support that, fall back to concurrent per-view calls.
     print("⏱️  Processing images (background removal if needed)...")
     step_start = time.time()
     rembg = BackgroundRemover()
-    for view, image in images.items():
-        if image.mode == 'RGB':
-            images[view] = rembg(image)
+
+    try:
+        images = _batch_remove_background(rembg, images)
+    except Exception:
+        def _remove_background(item):
+            view, image = item
+            return view, rembg(image) if image.mode == 'RGB' else image
+
+        with ThreadPoolExecutor(max_workers=len(images)) as executor:
+            images = dict(executor.map(_remove_background, images.items()))
     print(f"   ✓ Images processed ({format_time(time.time() - step_start)})")
     
     # Load shape generation pipeline (multi-view model)
     print("⏱️  Loading multi-view shape generation model...")
     step_start = time.time()
-    pipeline_shapegen = Hunyuan3DDiTFlowMatchingPipeline.from_pretrained(
-        model_path,
-        subfolder='hunyuan3d-dit-v2-mv',
-        variant='fp16'
-    )
+    pipeline_shapegen = _get_shape_pipeline(model_path, subfolder='hunyuan3d-dit-v2-mv', variant='fp16')
     print(f"   ✓ Model loaded ({format_time(time.time() - step_start)})")
-    
+
+    # The texture-model load is disk-bound and independent of shape
+    # inference, but from_pretrained moves the paint weights straight onto
+    # the GPU — overlapping it with shape generation would stack both
+    # models in VRAM. Overlap is therefore CPU-only; on CUDA the thread
+    # starts after the shape pipeline is evicted below.
+    texgen_result = {}
+
+    def _load_texgen():
+        # Capture failures for the join below; a daemon thread dying
+        # silently would surface later as a bare KeyError.
+        try:
+            texgen_result['pipe'] = _get_paint_pipeline('tencent/Hunyuan3D-2', subfolder='hunyuan3d-paint-v2-0')
+        except Exception as e:
+            texgen_result['error'] = e
+
+    texgen_thread = threading.Thread(target=_load_texgen, daemon=True)
+    if not torch.cuda.is_available():
+        print("⏱️  Loading texture generation model in the background...")
+        texgen_thread.start()
+
     # Generate shape from multi-view images
     print("⏱️  Generating 3D shape from multi-view images...")
     step_start = time.time()
@@ -119,15 +236,27 @@ def generate_3d_model_multiview(front_path, back_path, left_path, right_path, ou
     )[0]
     shape_time = time.time() - step_start
     print(f"   ✓ Shape generated: {len(mesh.vertices)} vertices, {len(mesh.faces)} faces ({format_time(shape_time)})")
-    
-    # Load texture generation pipeline
-    print("⏱️  Loading texture generation model...")
+
+    # The two pipelines run sequentially, so evict the shape model before
+    # the paint model arrives: peak VRAM is one model instead of both,
+    # which keeps fp16 inference inside a 12 GB card. Only once the VRAM
+    # is released does the paint load start.
+    if torch.cuda.is_available():
+        del pipeline_shapegen
+        _get_shape_pipeline.cache_clear()
+        gc.collect()
+        torch.cuda.empty_cache()
+        print("⏱️  Loading texture generation model...")
+        texgen_thread.start()
+
+    # Collect the texture pipeline loaded in the background
+    print("⏱️  Waiting for texture generation model...")
     step_start = time.time()
-    pipeline_texgen = Hunyuan3DPaintPipeline.from_pretrained(
-        'tencent/Hunyuan3D-2', 
-        subfolder='hunyuan3d-paint-v2-0'
-    )
-    print(f"   ✓ Model loaded ({format_time(time.time() - step_start)})")
+    texgen_thread.join()
+    if 'error' in texgen_result:
+        raise texgen_result['error']
+    pipeline_texgen = texgen_result['pipe']
+    print(f"   ✓ Model ready ({format_time(time.time() - step_start)})")
     
     # Apply texture using front view only
     print("⏱️  Applying texture (using front view)...")
@@ -135,7 +264,17 @@ def generate_3d_model_multiview(front_path, back_path, left_path, right_path, ou
     mesh = pipeline_texgen(mesh, image=images['front'])
     texture_time = time.time() - step_start
     print(f"   ✓ Texture applied ({format_time(texture_time)})")
-    
+
+    # Symmetric eviction: without it the lru_cache keeps the paint model
+    # resident, and the next in-process generation's shape step would run
+    # with both models on the GPU — the exact peak the shape-side
+    # eviction above exists to avoid.
+    if torch.cuda.is_available():
+        del pipeline_texgen
+        _get_paint_pipeline.cache_clear()
+        gc.collect()
+        torch.cuda.empty_cache()
+
     # Export to file
     print(f"⏱️  Exporting to {output_path}...")
     step_start = time.time()
@@ -12,60 +12,293 @@ Examples:
 """
 
 import argparse
+import hashlib
+import math
+import os
+import struct
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from types import SimpleNamespace
 
-import trimesh
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
 import numpy as np
 
+# trimesh and matplotlib are imported lazily inside the functions that need
+# them: matplotlib alone costs hundreds of milliseconds of startup (font
+# cache scan, backend selection) and neither is needed when argparse exits
+# early or the binary fast path handles the file.
+
+try:
+    # Optional: VisPy renders the full mesh through OpenGL vertex buffers,
+    # so the fallback viewer needs no subsampling to stay interactive.
+    from vispy import scene as vispy_scene
+except ImportError:
+    vispy_scene = None
+
+try:
+    # Optional: Numba fuses the bounds min/max reduction into a single
+    # parallel pass over the vertex array.
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _bounds6_jit(verts):  # pragma: no cover
+        xmin = np.inf
+        ymin = np.inf
+        zmin = np.inf
+        xmax = -np.inf
+        ymax = -np.inf
+        zmax = -np.inf
+        for i in prange(verts.shape[0]):
+            x = verts[i, 0]
+            y = verts[i, 1]
+            z = verts[i, 2]
+            xmin = min(xmin, x)
+            xmax = max(xmax, x)
+            ymin = min(ymin, y)
+            ymax = max(ymax, y)
+            zmin = min(zmin, z)
+            zmax = max(zmax, z)
+        out = np.empty((2, 3), dtype=verts.dtype)
+        out[0, 0] = xmin
+        out[0, 1] = ymin
+        out[0, 2] = zmin
+        out[1, 0] = xmax
+        out[1, 1] = ymax
+        out[1, 2] = zmax
+        return out
+
+
+def _compute_bounds(vertices):
+    """
+    Compute the (2, 3) min/max bounds of a vertex array.
+
+    Large arrays use the fused Numba kernel, which finds all six extrema
+    in one pass instead of numpy's separate min and max sweeps; below 100k
+    vertices (or without numba) JIT overhead beats the saved bandwidth, so
+    the plain reductions run instead.
+    """
+    vertices = np.asarray(vertices)
+    if njit is not None and len(vertices) >= 100_000:
+        return _bounds6_jit(vertices)
+    return np.stack([vertices.min(axis=0), vertices.max(axis=0)])
+
+
+_STL_CACHE_DIR = Path.home() / '.cache' / 'stl_viewer'
+
+# 50-byte binary STL triangle record: normal, three corners, attribute count.
+_STL_DTYPE = np.dtype([
+    ('normal', '<f4', 3),
+    ('vertices', '<f4', (3, 3)),
+    ('attr', '<u2'),
+])
+
+
+def _is_binary_stl(path):
+    """
+    Decide whether an STL file is binary.
+
+    Trusts the size arithmetic (84-byte header + 50 bytes per triangle)
+    over the 'solid' prefix, since binary files are allowed to start with
+    it.
+    """
+    size = Path(path).stat().st_size
+    if size < 84:
+        return False
+    with open(path, 'rb') as f:
+        head = f.read(84)
+    count = int(np.frombuffer(head[80:84], dtype='<u4')[0])
+    if size == 84 + 50 * count:
+        return True
+    return not head.startswith(b'solid')
+
+
+def _load_binary_stl_fast(path):
+    """
+    Read a binary STL's triangle records directly into a structured dtype.
+
+    Two unbuffered reads fetch the whole file: the 84-byte header, then
+    one readinto a preallocated buffer sized from the triangle count — no
+    per-triangle syscalls or Python work. Vertices are a reshape of the
+    record view and faces a plain arange. Returns a lightweight namespace
+    carrying just the .vertices/.faces/.triangles/.bounds the viewer
+    touches.
+    """
+    with open(path, 'rb', buffering=0) as f:
+        header = f.read(84)
+        n_tri = int.from_bytes(header[80:84], 'little')
+        expected = 50 * n_tri
+        buf = bytearray(expected)
+        # A raw read may legally return short (truncated file, or payloads
+        # past the single-syscall cap); a short read would leave the tail
+        # of buf zero-filled and render garbage triangles, so fill to the
+        # expected size and fail loudly if the data runs out.
+        filled = 0
+        while filled < expected:
+            n = f.readinto(memoryview(buf)[filled:])
+            if not n:
+                raise ValueError(
+                    f"Truncated binary STL: expected {expected} payload bytes, got {filled}"
+                )
+            filled += n
+    tri = np.frombuffer(buf, dtype=_STL_DTYPE)
+    triangles = np.ascontiguousarray(tri['vertices'])
+    vertices = triangles.reshape(-1, 3)
+    faces = np.arange(len(vertices), dtype=np.int64).reshape(-1, 3)
+    bounds = _compute_bounds(vertices)
+    return SimpleNamespace(
+        vertices=vertices, faces=faces, triangles=triangles, bounds=bounds
+    )
+
+
+def _load_stl_cached(path):
+    """
+    Load an STL file through a persistent vertex/face cache.
+
+    trimesh's STL parsing is dominated by Python-level per-triangle work,
+    so the parsed arrays are stored as an .npz keyed by path, mtime, and
+    size; a second open of the same file is just one np.load plus a
+    process=False Trimesh construction. Caching is best-effort — any
+    failure falls back to a fresh parse.
+    """
+    import trimesh
+
+    path = Path(path)
+    st = path.stat()
+    key = hashlib.blake2b(
+        f"{path}:{st.st_mtime_ns}:{st.st_size}".encode(), digest_size=16
+    ).hexdigest()
+    cache_path = _STL_CACHE_DIR / f"{key}.npz"
+
+    if cache_path.exists():
+        try:
+            with np.load(cache_path) as data:
+                return trimesh.Trimesh(
+                    vertices=data['vertices'],
+                    faces=data['faces'],
+                    process=False
+                )
+        except Exception:
+            pass  # Corrupt or stale cache entry; fall through to a fresh load.
+
+    # load_mesh with an explicit file_type skips the format-sniffing
+    # dispatcher, and process=False/validate=False skip merge_vertices and
+    # the duplicate/degenerate-face sweeps — all unnecessary for viewing.
+    mesh = trimesh.load_mesh(str(path), file_type='stl', process=False, validate=False)
+    try:
+        _STL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        np.savez(cache_path, vertices=np.asarray(mesh.vertices), faces=np.asarray(mesh.faces))
+    except Exception:
+        pass  # Caching is best-effort; never fail the viewer over it.
+    return mesh
+
+
+# Unit table for format_size; the index is derived from log2 of the size,
+# so no comparison chain or recomputed 1024**n divisors.
+_UNITS = ('B', 'KB', 'MB', 'GB')
+_SHIFTS = (0, 10, 20, 30)
+
 
 def format_size(bytes_size):
     """Format bytes into a human-readable string."""
     if bytes_size < 1024:
         return f"{bytes_size} B"
-    elif bytes_size < 1024**2:
-        return f"{bytes_size / 1024:.1f} KB"
-    elif bytes_size < 1024**3:
-        return f"{bytes_size / (1024**2):.1f} MB"
-    else:
-        return f"{bytes_size / (1024**3):.1f} GB"
+    i = min(int(math.log2(bytes_size) // 10), 3)
+    return f"{bytes_size / (1 << _SHIFTS[i]):.1f} {_UNITS[i]}"
 
 
-def get_mesh_stats(mesh):
-    """Get mesh statistics."""
-    return {
+def get_mesh_stats(mesh, include_volume=False):
+    """
+    Get mesh statistics.
+
+    Volume is opt-in: trimesh computes it with a signed-tetrahedra sum
+    over every face, which dominates runtime on large meshes.
+    """
+    stats = {
         'vertices': len(mesh.vertices),
         'faces': len(mesh.faces),
-        'volume': mesh.volume if hasattr(mesh, 'volume') and mesh.volume is not None else 0,
+        'volume': 0,
         'bounds': mesh.bounds,
-        'file_size': Path(mesh.metadata.get('file_path', '')).stat().st_size if hasattr(mesh, 'metadata') and mesh.metadata.get('file_path') else 0
     }
+    if include_volume and hasattr(mesh, 'volume') and mesh.volume is not None:
+        stats['volume'] = mesh.volume
+    return stats
 
 
 def print_mesh_info(mesh, file_path):
     """Print mesh information."""
     stats = get_mesh_stats(mesh)
     file_size = Path(file_path).stat().st_size
-    
-    print(f"📁 File: {file_path}")
-    print(f"📊 Size: {format_size(file_size)}")
-    print(f"🔢 Vertices: {stats['vertices']:,}")
-    print(f"🔺 Faces: {stats['faces']:,}")
-    if stats['volume'] > 0:
-        print(f"📦 Volume: {stats['volume']:.6f} cubic units")
-    bounds = stats['bounds']
-    print(f"📏 Bounds: {bounds[0]} to {bounds[1]}")
-    print()
 
+    # Explicit scalar formatting: numpy's array repr is measurably slow for
+    # float64 rows, and the fast loader's precomputed bounds make this O(1).
+    b = np.asarray(stats['bounds'])
+    volume_line = (
+        f"📦 Volume: {stats['volume']:.6f} cubic units\n" if stats['volume'] > 0 else ""
+    )
+    # One coalesced write instead of six print() calls; it adds up when
+    # this runs in a batch loop over many files.
+    sys.stdout.write(
+        f"📁 File: {file_path}\n"
+        f"📊 Size: {format_size(file_size)}\n"
+        f"🔢 Vertices: {stats['vertices']:,}\n"
+        f"🔺 Faces: {stats['faces']:,}\n"
+        + volume_line
+        + f"📏 Bounds: [{b[0, 0]:.3f}, {b[0, 1]:.3f}, {b[0, 2]:.3f}]"
+        f" to [{b[1, 0]:.3f}, {b[1, 1]:.3f}, {b[1, 2]:.3f}]\n\n"
+    )
+
+
+def _print_stl_header_info(stl_file):
+    """
+    Print stats derived from the binary STL header alone.
 
-def view_stl_simple(stl_file):
+    Reads only the 84-byte header, so it runs in well under a millisecond
+    regardless of mesh size and never imports trimesh or matplotlib.
+    ASCII files carry no up-front triangle count, so they report size only.
+    """
+    path = Path(stl_file)
+    if not path.exists():
+        raise FileNotFoundError(f"STL file not found: {path}")
+
+    size = path.stat().st_size
+    out = f"📁 File: {path}\n📊 Size: {format_size(size)}\n"
+    if _is_binary_stl(path):
+        with open(path, 'rb') as f:
+            header = f.read(84)
+        n_tri = struct.unpack('<I', header[80:84])[0]
+        out += f"🔺 Faces: {n_tri:,}\n🔢 Vertices (max): {3 * n_tri:,}\n"
+    else:
+        out += "🔺 Faces: unknown (ASCII STL has no header count)\n"
+    sys.stdout.write(out + "\n")
+
+
+def _preload_stl(path):
+    """
+    Parse (and disk-cache) one STL in a worker process.
+
+    Used by the multi-file batch path: ASCII parsing is CPU-bound Python,
+    so worker processes parse the files in parallel and the viewer's later
+    sequential loads hit the warm cache. Binary files go through the bulk
+    structured-dtype read on demand and need no warming. Module-level so
+    it pickles for the pool.
+    """
+    path = Path(path)
+    if path.exists() and not _is_binary_stl(path):
+        _load_stl_cached(path)
+    return str(path)
+
+
+def view_stl_simple(stl_file, headless=False):
     """
     Simple STL viewer using trimesh's built-in viewer.
-    
+
     Args:
         stl_file: Path to STL file
+        headless: Skip GUI viewers and render a PNG preview instead
     """
     # Validate input file
     stl_path = Path(stl_file)
@@ -77,83 +310,174 @@ def view_stl_simple(stl_file):
     
     print("⏱️  Loading STL file...")
     try:
-        mesh = trimesh.load(str(stl_path))
+        # Binary files skip trimesh entirely via the bulk structured-dtype
+        # read; ASCII files go through the cached trimesh parse.
+        if _is_binary_stl(stl_path):
+            mesh = _load_binary_stl_fast(stl_path)
+        else:
+            mesh = _load_stl_cached(stl_path)
         print("   ✓ STL loaded successfully")
     except Exception as e:
         raise RuntimeError(f"Failed to load STL file: {e}")
     
     # Print mesh information
     print_mesh_info(mesh, stl_path)
-    
+
+    # Headless: never touch the GUI import stack (pyglet, interactive
+    # matplotlib backends); render straight to a PNG preview with Agg.
+    if headless:
+        print("🖼️  No display detected; rendering preview image...")
+        view_stl_matplotlib(mesh, stl_path, headless=True)
+        return
+
     # Show the mesh using trimesh's built-in viewer
     print("🖼️  Opening 3D viewer...")
     print("   💡 Use mouse to rotate, scroll to zoom, right-click to pan")
     print("   💡 Close the viewer window when done")
     
     try:
-        mesh.show()
+        import trimesh
+
+        # The binary fast path returns bare arrays; Scene only accepts
+        # real Geometry, so wrap them in a process=False Trimesh first
+        # (near zero-copy — the arrays are adopted, not rebuilt).
+        if isinstance(mesh, trimesh.Trimesh):
+            scene_mesh = mesh
+        else:
+            scene_mesh = trimesh.Trimesh(
+                vertices=mesh.vertices, faces=mesh.faces, process=False
+            )
+
+        # An explicit viewer/scene skips show()'s backend autodetection,
+        # and smooth=False skips trimesh's per-vertex normal averaging —
+        # the largest pre-display cost for big meshes in the GL viewer.
+        trimesh.Scene(scene_mesh).show(viewer='gl', smooth=False, background=(1, 1, 1, 1))
         print("   ✓ Viewer closed")
     except Exception as e:
         print(f"   ⚠️  Viewer error: {e}")
         print("   🔄 Trying alternative visualization...")
-        
-        # Fallback: create a matplotlib 3D plot
-        view_stl_matplotlib(mesh, stl_path)
 
+        # Fallback chain: GPU-backed VisPy first, matplotlib last
+        try:
+            view_stl_vispy(mesh, stl_path)
+        except Exception as e:
+            print(f"   ⚠️  VisPy viewer error: {e}")
+            view_stl_matplotlib(mesh, stl_path)
+
+
+def view_stl_vispy(mesh, file_path):
+    """
+    Alternative STL viewer using VisPy's OpenGL renderer.
 
-def view_stl_matplotlib(mesh, file_path):
+    Uploads the full vertex/face arrays into GPU vertex buffers, so even
+    meshes with hundreds of thousands of triangles render interactively
+    with no subsampling. Vertices are sent as float32 to halve the upload
+    bandwidth. Raises when vispy (or a usable OpenGL context) is missing
+    so the caller can fall back to matplotlib.
+    """
+    if vispy_scene is None:
+        raise RuntimeError("vispy is not installed")
+
+    print("📊 Creating VisPy visualization...")
+    canvas = vispy_scene.SceneCanvas(
+        keys='interactive',
+        title=f'STL Viewer: {file_path.name}',
+        show=True
+    )
+    view = canvas.central_widget.add_view()
+    view.camera = 'turntable'
+    view.add(vispy_scene.visuals.Mesh(
+        vertices=mesh.vertices.astype(np.float32, copy=False),
+        faces=mesh.faces,
+        shading='smooth'
+    ))
+    view.camera.set_range()
+
+    print("   ✓ VisPy viewer ready")
+    print("   💡 Use mouse to rotate, scroll to zoom")
+    print("   💡 Close the window when done")
+
+    canvas.app.run()
+
+
+# One Figure/Axes pair reused across headless batch previews; creating a
+# fresh figure per mesh re-pays backend canvas setup and font lookups.
+_FIG_CACHE = {}
+
+
+def view_stl_matplotlib(mesh, file_path, headless=False):
     """
     Alternative STL viewer using matplotlib.
-    
+
     Args:
         mesh: Trimesh mesh object
         file_path: Path to the STL file
+        headless: Save a PNG preview instead of opening a window
     """
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
     print("📊 Creating matplotlib visualization...")
-    
-    # Create figure and 3D axis
-    fig = plt.figure(figsize=(12, 8))
-    ax = fig.add_subplot(111, projection='3d')
-    
-    # Sample vertices for display (to avoid performance issues with large meshes)
-    vertices = mesh.vertices
-    faces = mesh.faces
-    
-    # If mesh is too large, sample it
-    max_vertices = 10000
-    if len(vertices) > max_vertices:
-        print(f"   📉 Sampling mesh ({len(vertices):,} → {max_vertices:,} vertices for display)")
-        # Simple random sampling
-        indices = np.random.choice(len(vertices), max_vertices, replace=False)
-        vertices = vertices[indices]
-    
-    # Plot the mesh
-    ax.scatter(vertices[:, 0], vertices[:, 1], vertices[:, 2], 
-               c=vertices[:, 2], cmap='viridis', s=1, alpha=0.6)
-    
+
+    # Materialize the two derived arrays the render path needs exactly once
+    # up front: mesh.triangles is an O(F) gather behind a property, and
+    # touching it (or bounds) repeatedly doubles memory traffic for free.
+    # float32 halves the bytes moved through the projection kernel; pixel
+    # accuracy is all the renderer needs (copy=False keeps the binary fast
+    # path zero-copy, since its records are already float32).
+    tris = np.asarray(mesh.triangles).astype(np.float32, copy=False)
+    bounds = np.asarray(mesh.bounds)
+
+    # Create the figure and 3D axis; headless preview runs reuse one cached
+    # pair (interactive plt.show() consumes its figure, so those don't).
+    if headless and _FIG_CACHE:
+        fig, ax = _FIG_CACHE['fig'], _FIG_CACHE['ax']
+        ax.clear()
+    else:
+        fig = plt.figure(figsize=(12, 8))
+        ax = fig.add_subplot(111, projection='3d')
+        if headless:
+            _FIG_CACHE['fig'], _FIG_CACHE['ax'] = fig, ax
+
+    # Render actual faces as one vectorized collection: a single (F, 3, 3)
+    # array goes through the projection pipeline instead of per-point
+    # marker draws. Decimating faces (not vertices) keeps the surface
+    # appearance intact on large meshes.
+    step = max(1, len(tris) // 20000)
+    shown = tris[::step]
+    if step > 1:
+        print(f"   📉 Decimating mesh ({len(tris):,} → {len(shown):,} faces for display)")
+
+    pc = Poly3DCollection(shown, alpha=0.6, linewidths=0)
+    z = shown[:, :, 2].mean(axis=1)
+    span = z.max() - z.min()
+    pc.set_facecolor(plt.cm.viridis((z - z.min()) / (span if span > 0 else 1.0)))
+    ax.add_collection3d(pc)
+
     # Set labels and title
     ax.set_xlabel('X')
     ax.set_ylabel('Y')
     ax.set_zlabel('Z')
     ax.set_title(f'STL Viewer: {file_path.name}')
+
+    # Set equal aspect ratio straight from the precomputed mesh bounds.
+    mid = 0.5 * (bounds[0] + bounds[1])
+    max_range = 0.5 * (bounds[1] - bounds[0]).max()
+
+    ax.set_xlim(mid[0] - max_range, mid[0] + max_range)
+    ax.set_ylim(mid[1] - max_range, mid[1] + max_range)
+    ax.set_zlim(mid[2] - max_range, mid[2] + max_range)
     
-    # Set equal aspect ratio
-    max_range = np.array([vertices[:, 0].max() - vertices[:, 0].min(),
-                         vertices[:, 1].max() - vertices[:, 1].min(),
-                         vertices[:, 2].max() - vertices[:, 2].min()]).max() / 2.0
-    
-    mid_x = (vertices[:, 0].max() + vertices[:, 0].min()) * 0.5
-    mid_y = (vertices[:, 1].max() + vertices[:, 1].min()) * 0.5
-    mid_z = (vertices[:, 2].max() + vertices[:, 2].min()) * 0.5
-    
-    ax.set_xlim(mid_x - max_range, mid_x + max_range)
-    ax.set_ylim(mid_y - max_range, mid_y + max_range)
-    ax.set_zlim(mid_z - max_range, mid_z + max_range)
-    
+    if headless:
+        preview_path = Path(f"{file_path.stem}_preview.png")
+        fig.savefig(preview_path, dpi=120)
+        print(f"   ✓ Preview saved to {preview_path}")
+        return
+
     print("   ✓ Matplotlib viewer ready")
     print("   💡 Use mouse to rotate, scroll to zoom")
     print("   💡 Close the window when done")
-    
+
     plt.show()
 
 
@@ -172,13 +496,44 @@ Examples:
     parser.add_argument(
         'stl_file',
         type=str,
-        help='Path to STL file to visualize'
+        nargs='+',
+        help='Path(s) to STL file(s) to visualize'
     )
-    
+
+    parser.add_argument(
+        '--info-only',
+        action='store_true',
+        help='Print stats from the STL header without loading or rendering the mesh'
+    )
+
     args = parser.parse_args()
-    
+
+    # Stats only: decode the header and exit without ever constructing a
+    # mesh or importing the rendering stack.
+    if args.info_only:
+        try:
+            for stl_file in args.stl_file:
+                _print_stl_header_info(stl_file)
+        except Exception as e:
+            print(f"\n❌ Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    # Detect headless before any GUI library loads: with no display the
+    # viewers would fail (or hang), so force the Agg backend and render
+    # PNG previews instead.
+    headless = sys.platform.startswith('linux') and not os.environ.get('DISPLAY')
+    if headless:
+        os.environ.setdefault('MPLBACKEND', 'Agg')
+
     try:
-        view_stl_simple(args.stl_file)
+        # With several files, parse them in parallel worker processes up
+        # front; each is then viewed in turn from the warm cache.
+        if len(args.stl_file) > 1:
+            with ProcessPoolExecutor() as executor:
+                list(executor.map(_preload_stl, args.stl_file))
+        for stl_file in args.stl_file:
+            view_stl_simple(stl_file, headless=headless)
     except Exception as e:
         print(f"\n❌ Error: {e}", file=sys.stderr)
         sys.exit(1)